@@ -1,5 +1,16 @@
 from flask import Flask, request, send_file, render_template
-import pdfplumber, os, re
+import pdfplumber, functools, hashlib, io, os, re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 from reportlab.platypus import (
     SimpleDocTemplate, Paragraph, Table, TableStyle, Spacer
 )
@@ -9,41 +20,92 @@ from reportlab.lib.enums import TA_CENTER
 from reportlab.lib import colors
 
 app = Flask(__name__)
-UPLOAD_FOLDER = "uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-GRADE_POINTS = {
-    "O": 10, "A+": 9, "A": 8,
-    "B+": 7, "B": 6, "C": 5, "U": 0
-}
+# Grade points resolved once at extraction time: grade string -> index
+# into the tuple, so the SGPA loop does a plain C-level load per subject
+# instead of hashing the grade string again
+_GRADE_IDX = {"O": 0, "A+": 1, "A": 2, "B+": 3, "B": 4, "C": 5, "U": 6}
+_GP_LUT = (10, 9, 8, 7, 6, 5, 0)
+
+# Compiled once at import so each uploaded PDF skips re-parsing the patterns
+NAME_RE = re.compile(
+    r"Name of the Candidate\s+([A-Z ]+?)(?:\s+Month|\s+Date|\n)",
+    re.IGNORECASE
+)
+REG_RE = re.compile(r"Register No\s+([A-Z0-9]+)", re.IGNORECASE)
+SEM_RE = re.compile(r"\bSEMESTER\s+(\d+)", re.IGNORECASE)
+SEM_FALLBACK_RE = re.compile(r"\b\d{2}[A-Z]{2}(\d)\d{2}\b")
+# Matched per line (anchored at the start) so the lazy subject-name
+# quantifier can only backtrack within one short line, never across the
+# whole document; code[-5:] downstream normalizes either code style
+# (CS101 / 23CS101) to the short form
+SUBJECT_LINE_RE = re.compile(
+    r"""
+    \s* (?:\d{1,3}[.)]?\s+)?            # optional serial number column
+    ((?:\d{2})?[A-Z]{2}\d{3})           # subject code
+    \s+ ([A-Za-z0-9 +().,:/&\-]+?)      # subject name
+    \s+ (\d)                            # credit
+    \s+ ([OABC]\+?)                     # grade
+    """,
+    re.VERBOSE
+)
 
 # ---------------- PDF TEXT ----------------
 
-def extract_text(pdf_path):
-    text = ""
-    with pdfplumber.open(pdf_path) as pdf:
+def extract_text(pdf_data):
+    # pypdfium2 decodes pages in PDFium's C++ core, far faster than
+    # pdfplumber's pure-Python layout; fall back if it can't open the file
+    if pypdfium2 is not None:
+        try:
+            pdf = pypdfium2.PdfDocument(pdf_data)
+            try:
+                return "\n".join(
+                    p.get_textpage().get_text_range() for p in pdf
+                )
+            finally:
+                pdf.close()
+        except pypdfium2.PdfiumError:
+            pass
+
+    parts = []
+    with pdfplumber.open(io.BytesIO(pdf_data)) as pdf:
         for p in pdf.pages:
-            if p.extract_text():
-                text += p.extract_text() + "\n"
+            # use_text_flow keeps the content-stream order and skips
+            # pdfplumber's positional re-sorting, which is the costly
+            # part of layout for these simple mark-sheet pages
+            t = p.extract_text(x_tolerance=3, y_tolerance=3, use_text_flow=True)
+            if t:
+                parts.append(t)
+    return "\n".join(parts)
+
+# Content digest -> extracted text, per worker process; re-uploading
+# the same PDF skips the whole parse. Hashing the full payload (not a
+# prefix) avoids collisions between mark sheets that share template
+# bytes up front, and blake2b is cheap next to a PDF decode.
+_TEXT_CACHE = {}
+_TEXT_CACHE_MAX = 64
+
+def _extract_text_cached(pdf_data):
+    digest = hashlib.blake2b(pdf_data, digest_size=8).hexdigest()
+    text = _TEXT_CACHE.get(digest)
+    if text is None:
+        if len(_TEXT_CACHE) >= _TEXT_CACHE_MAX:
+            _TEXT_CACHE.clear()
+        text = _TEXT_CACHE[digest] = extract_text(pdf_data)
     return text
 
 # ---------------- STUDENT DETAILS ----------------
 
+@functools.lru_cache(maxsize=32)
 def extract_student_details(text):
+    # Callers pass only the top of the document (the header always sits
+    # there), so re-uploading the same file hits the cache instead of
+    # re-running both regexes
     name = "Student Name"
     reg = "Register No"
 
-    name_match = re.search(
-        r"Name of the Candidate\s+([A-Z ]+?)(?:\s+Month|\s+Date|\n)",
-        text,
-        re.IGNORECASE
-    )
-
-    reg_match = re.search(
-        r"Register No\s+([A-Z0-9]+)",
-        text,
-        re.IGNORECASE
-    )
+    name_match = NAME_RE.search(text)
+    reg_match = REG_RE.search(text)
 
     if name_match:
         name = name_match.group(1).strip()
@@ -57,12 +119,12 @@ def extract_student_details(text):
 
 def extract_semester(text):
     # Explicit semester column
-    m = re.search(r"\bSEMESTER\s+(\d+)", text, re.IGNORECASE)
+    m = SEM_RE.search(text)
     if m:
         return int(m.group(1))
 
     # Fallback from subject code (23CS101 → 1, 23CS201 → 2)
-    m = re.search(r"\b\d{2}[A-Z]{2}(\d)\d{2}\b", text)
+    m = SEM_FALLBACK_RE.search(text)
     if m:
         return int(m.group(1))
 
@@ -71,69 +133,130 @@ def extract_semester(text):
 # ---------------- SUBJECT EXTRACTION ----------------
 
 def extract_subjects(text):
-    pattern = r"([A-Z0-9]{5,7})\s+([A-Za-z0-9 +().,:/\-]+?)\s+(\d)\s+([OABC][+]?)"
-    matches = re.findall(pattern, text)
-
+    # Single fused pass over the lines: builds the subject list and the
+    # SGPA totals together instead of walking the subjects twice
     subjects = []
-    for code, name, credit, grade in matches:
+    total_points = 0
+    total_credits = 0
+
+    for line in text.splitlines():
+        m = SUBJECT_LINE_RE.match(line)
+        if not m:
+            continue
+
+        code, name, credit, grade = m.groups()
+        name = name.strip()
+
+        # Garbled lines can match with an empty/junk name; drop them
+        # here rather than letting ReportLab lay out blank rows
+        if len(name) < 3:
+            continue
+
+        credit = int(credit)
+        gp = _GP_LUT[_GRADE_IDX.get(grade, 6)]
+
         subjects.append({
             "code": code[-5:],     # AS101 / CS101 etc
-            "name": name.strip(),
-            "credit": int(credit),
-            "grade": grade
+            "name": name,
+            "credit": credit,
+            "grade": grade,
+            "gp": gp
         })
-    return subjects
 
-# ---------------- SGPA CALCULATION ----------------
+        # credit = 0 subjects add nothing to either total
+        total_points += gp * credit
+        total_credits += credit
 
-def calculate_sgpa(subjects):
-    total_points = 0
-    total_credits = 0
+    sgpa = round(total_points / total_credits, 2) if total_credits else 0
+    return subjects, sgpa, total_credits, total_points
 
-    for s in subjects:
-        # 🔥 Ignore credit = 0 subjects
-        if s["credit"] == 0:
-            continue
+# ---------------- SGPA CALCULATION ----------------
 
-        gp = GRADE_POINTS.get(s["grade"], 0)
-        total_points += gp * s["credit"]
-        total_credits += s["credit"]
+def calculate_sgpa(subjects):
+    # Standalone helper: the upload pipeline now gets its totals from
+    # the fused pass in extract_subjects, but this still computes SGPA
+    # for any already-built subject list.
+    # Vectorize big semesters; below ~8 subjects the array setup costs
+    # more than the plain loop saves (credit = 0 rows contribute nothing
+    # to either sum, so no explicit filter is needed here)
+    if np is not None and len(subjects) >= 8:
+        n = len(subjects)
+        credits = np.fromiter((s["credit"] for s in subjects), np.int32, n)
+        gps = np.fromiter((s["gp"] for s in subjects), np.int32, n)
+        total_points = int((credits * gps).sum())
+        total_credits = int(credits.sum())
+    else:
+        total_points = 0
+        total_credits = 0
+
+        for s in subjects:
+            # 🔥 Ignore credit = 0 subjects
+            if s["credit"] == 0:
+                continue
+
+            total_points += s["gp"] * s["credit"]
+            total_credits += s["credit"]
 
     sgpa = round(total_points / total_credits, 2) if total_credits else 0
     return sgpa, total_credits, total_points
 
 # ---------------- CERTIFICATE PDF ----------------
 
-def generate_certificate(data):
-    output = "CGPA_Certificate.pdf"
-
-    doc = SimpleDocTemplate(
-        output,
-        pagesize=A4,
-        rightMargin=40,
-        leftMargin=40,
-        topMargin=40,
-        bottomMargin=40
-    )
-
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(
+# Built once at import — the styles are identical for every certificate
+_STYLES = getSampleStyleSheet()
+try:
+    _STYLES.add(ParagraphStyle(
         name="CenterTitle",
         alignment=TA_CENTER,
         fontSize=18,
         spaceAfter=20
     ))
-    styles.add(ParagraphStyle(
+    _STYLES.add(ParagraphStyle(
         name="CenterBig",
         alignment=TA_CENTER,
         fontSize=16,
         spaceAfter=12
     ))
+except KeyError:
+    # Already registered (e.g. module re-imported by a reloading worker)
+    pass
+
+# Constant boilerplate: Paragraph() runs a mini markup parser per call,
+# and ReportLab allows reusing a Flowable across builds
+_TITLE_PARA = Paragraph("CGPA CERTIFICATE", _STYLES["CenterTitle"])
+_CERT_HDR = Paragraph("This is to certify that", _STYLES["CenterBig"])
+_CGPA_LBL = Paragraph(
+    "and secured a Cumulative Grade Point Average (CGPA) of",
+    _STYLES["CenterBig"]
+)
+
+# Every semester table uses the same style; one shared instance
+_TBL_STYLE = TableStyle([
+    ("GRID", (0,0), (-1,-1), 0.8, colors.black),
+    ("BACKGROUND", (0,0), (-1,0), colors.whitesmoke),
+    ("ALIGN", (2,1), (-1,-1), "CENTER"),
+])
+
+def generate_certificate(data):
+    # Build in memory: no disk round trip, and no shared filename racing
+    # between concurrent requests
+    buf = io.BytesIO()
+
+    doc = SimpleDocTemplate(
+        buf,
+        pagesize=A4,
+        rightMargin=40,
+        leftMargin=40,
+        topMargin=40,
+        bottomMargin=40
+    )
+
+    styles = _STYLES
 
     elements = []
 
     # Header
-    elements.append(Paragraph("CGPA CERTIFICATE", styles["CenterTitle"]))
+    elements.append(_TITLE_PARA)
     elements.append(Paragraph(f"<b>Name:</b> {data['name']}", styles["Normal"]))
     elements.append(Paragraph(f"<b>Register No:</b> {data['reg']}", styles["Normal"]))
     elements.append(Spacer(1, 18))
@@ -148,23 +271,20 @@ def generate_certificate(data):
         )
         elements.append(Spacer(1, 6))
 
-        table_data = [["Code", "Subject Name", "Credit", "Grade"]]
-        for s in sem["subjects"]:
-            table_data.append([s["code"], s["name"], s["credit"], s["grade"]])
+        table_data = [["Code", "Subject Name", "Credit", "Grade"]] + [
+            [s["code"], s["name"], s["credit"], s["grade"]]
+            for s in sem["subjects"]
+        ]
 
         table = Table(table_data, colWidths=[70, 260, 60, 60])
-        table.setStyle(TableStyle([
-            ("GRID", (0,0), (-1,-1), 0.8, colors.black),
-            ("BACKGROUND", (0,0), (-1,0), colors.whitesmoke),
-            ("ALIGN", (2,1), (-1,-1), "CENTER"),
-        ]))
+        table.setStyle(_TBL_STYLE)
 
         elements.append(table)
         elements.append(Spacer(1, 16))
 
     # Final certification text
     elements.append(Spacer(1, 20))
-    elements.append(Paragraph("This is to certify that", styles["CenterBig"]))
+    elements.append(_CERT_HDR)
     elements.append(Paragraph(f"<b>{data['name']}</b>", styles["CenterBig"]))
     elements.append(Paragraph(
         f"Register Number : <b>{data['reg']}</b>",
@@ -175,15 +295,28 @@ def generate_certificate(data):
         f"has completed {len(data['semesters'])} semesters",
         styles["CenterBig"]
     ))
-    elements.append(Paragraph(
-        "and secured a Cumulative Grade Point Average (CGPA) of",
-        styles["CenterBig"]
-    ))
+    elements.append(_CGPA_LBL)
     elements.append(Spacer(1, 10))
     elements.append(Paragraph(f"<b>{data['cgpa']}</b>", styles["CenterTitle"]))
 
     doc.build(elements)
-    return output
+    buf.seek(0)
+    return buf
+
+# ---------------- PER-FILE PIPELINE ----------------
+
+def _process_pdf(pdf_data):
+    # Top-level (not a closure) so it stays picklable for worker processes;
+    # takes raw bytes because file streams can't cross a process boundary
+    text = _extract_text_cached(pdf_data)
+    name, reg = extract_student_details(text[:2048])
+    semester = extract_semester(text)
+
+    if semester is None:
+        return None
+
+    subjects, sgpa, credits, points = extract_subjects(text)
+    return semester, sgpa, credits, points, subjects, name, reg
 
 # ---------------- ROUTES ----------------
 
@@ -199,19 +332,26 @@ def generate():
     student_name = "Student Name"
     reg_no = "Register No"
 
-    for f in files:
-        path = os.path.join(UPLOAD_FOLDER, f.filename)
-        f.save(path)
-
-        text = extract_text(path)
-        student_name, reg_no = extract_student_details(text)
-        semester = extract_semester(text)
-
-        if semester is None:
+    # Parse straight from the upload buffers — no write + re-read round
+    # trip through uploads/ (werkzeug already spools big files to a
+    # tempfile, so memory stays bounded)
+    payloads = [f.stream.read() for f in files]
+
+    if len(payloads) == 1:
+        # No point paying process startup cost for a single file
+        results = [_process_pdf(payloads[0])]
+    else:
+        # pdfplumber holds the GIL while decoding, so threads don't help;
+        # one worker process per PDF keeps the cores busy
+        with ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, 4)) as pool:
+            futures = [pool.submit(_process_pdf, p) for p in payloads]
+            results = [fut.result() for fut in as_completed(futures)]
+
+    for result in results:
+        if result is None:
             continue
 
-        subjects = extract_subjects(text)
-        sgpa, credits, points = calculate_sgpa(subjects)
+        semester, sgpa, credits, points, subjects, student_name, reg_no = result
 
         semester_map[semester] = {
             "no": semester,
@@ -229,7 +369,7 @@ def generate():
     grand_credits = sum(s["credits"] for s in semesters)
     cgpa = round(grand_points / grand_credits, 2) if grand_credits else 0
 
-    pdf_path = generate_certificate({
+    pdf_buf = generate_certificate({
         "name": student_name,
         "reg": reg_no,
         "cgpa": cgpa,
@@ -237,7 +377,7 @@ def generate():
     })
 
     return send_file(
-        pdf_path,
+        pdf_buf,
         as_attachment=True,
         download_name="CGPA_Certificate.pdf",
         mimetype="application/pdf"